@@ -0,0 +1,50 @@
+import numpy as np
+
+from engine import DIRECTIONS
+
+
+def asof_indices(left_ts, right_ts, tolerance, direction="backward"):
+    # For every left timestamp, the index of the matching right sample or -1.
+    # Both inputs must be sorted; cost is O(m log n) inside numpy.
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+    left = np.asarray(left_ts, dtype=np.float64)
+    right = np.asarray(right_ts, dtype=np.float64)
+    if not len(right):
+        return np.full(len(left), -1, dtype=np.intp)
+    before = np.searchsorted(right, left, "right") - 1
+    after = np.searchsorted(right, left, "left")
+    back_gap = np.where(before >= 0, left - right[np.clip(before, 0, None)], np.inf)
+    fwd_gap = np.where(after < len(right), right[np.clip(after, None, len(right) - 1)] - left, np.inf)
+    if direction == "backward":
+        idx, gap = before, back_gap
+    elif direction == "forward":
+        idx, gap = after, fwd_gap
+    else:
+        use_after = fwd_gap < back_gap
+        idx = np.where(use_after, after, before)
+        gap = np.where(use_after, fwd_gap, back_gap)
+    return np.where(gap <= tolerance, idx, -1)
+
+
+def asof_merge(left_ts, left_values, right_ts, right_values, tolerance, direction="backward", fill=np.nan):
+    # Returns the right values aligned to the left timestamps, `fill` where
+    # no right sample lies within `tolerance`.
+    idx = asof_indices(left_ts, right_ts, tolerance, direction)
+    right_values = np.asarray(right_values, dtype=np.float64)
+    matched = np.full(len(idx), fill, dtype=np.float64)
+    hit = idx >= 0
+    matched[hit] = right_values[idx[hit]]
+    return np.asarray(left_ts), np.asarray(left_values, dtype=np.float64), matched
+
+
+def asof_join_many(series, base_ts, base_values, tolerance, direction="backward"):
+    # Aligns one base series (e.g. a hyphenmon metric) to every series in
+    # `series` (name -> (timestamps, values), e.g. thousands of Zabbix items).
+    # Returns name -> (timestamps, values, base values matched as-of).
+    base_ts = np.asarray(base_ts, dtype=np.float64)
+    base_values = np.asarray(base_values, dtype=np.float64)
+    return {
+        name: asof_merge(ts, values, base_ts, base_values, tolerance, direction)
+        for name, (ts, values) in series.items()
+    }
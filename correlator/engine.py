@@ -0,0 +1,79 @@
+from bisect import bisect_left
+
+DIRECTIONS = ("backward", "forward", "nearest")
+
+
+def _clock(item):
+    clock = item.get("lastclock", 0)
+    return int(clock) if isinstance(clock, str) else clock
+
+
+def _asof_walk(timestamps, values, grid, tolerance, direction):
+    # one merge pass over a sorted series and a sorted grid: O(n + m)
+    out = []
+    n = len(timestamps)
+    i = 0
+    for t in grid:
+        if direction == "forward":
+            while i < n and timestamps[i] < t:
+                i += 1
+            out.append(values[i] if i < n and timestamps[i] - t <= tolerance else None)
+            continue
+        while i < n and timestamps[i] <= t:
+            i += 1
+        # timestamps[i - 1] is the last sample at or before t
+        best = None
+        if i and t - timestamps[i - 1] <= tolerance:
+            best = i - 1
+        if direction == "nearest" and i < n and timestamps[i] - t <= tolerance:
+            if best is None or timestamps[i] - t < t - timestamps[best]:
+                best = i
+        out.append(values[best] if best is not None else None)
+    return out
+
+
+def time_grid(start, end, step):
+    n = int((end - start) // step) + 1
+    return [start + k * step for k in range(max(n, 0))]
+
+
+def align(series, step, tolerance, direction="backward", start=None, end=None):
+    # series maps a name to sorted (timestamps, values) sequences, e.g. the
+    # memoryview windows of the aggregator's SampleHistory. Every series is
+    # sampled on one grid with an as-of join: each grid point takes the last
+    # sample at or before it ("backward"), the first after it ("forward") or
+    # the closest ("nearest"), if that sample is within `tolerance` seconds.
+    # Points without a match are None.
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+    bounds = [(ts[0], ts[-1]) for ts, _ in series.values() if len(ts)]
+    if not bounds:
+        return [], {name: [] for name in series}
+    start = min(b[0] for b in bounds) if start is None else start
+    end = max(b[1] for b in bounds) if end is None else end
+    grid = time_grid(start, end, step)
+    return grid, {name: _asof_walk(ts, values, grid, tolerance, direction) for name, (ts, values) in series.items()}
+
+
+def correlate_all(zabbix_data, hyphenmon_data, tolerance=10):
+    # Joins every Zabbix item with the hyphenmon sample closest to its
+    # lastclock. zabbix_data is a list of items or a dict of hostid -> items,
+    # hyphenmon_data a single sample or a list of them.
+    samples = [hyphenmon_data] if isinstance(hyphenmon_data, dict) else list(hyphenmon_data)
+    samples.sort(key=lambda s: s["timestamp"])
+    stamps = [s["timestamp"] for s in samples]
+    if isinstance(zabbix_data, dict):
+        items = [item for host_items in zabbix_data.values() for item in host_items]
+    else:
+        items = zabbix_data
+    joined = []
+    for item in items:
+        z_ts = _clock(item)
+        i = bisect_left(stamps, z_ts)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(stamps)]
+        if not candidates:
+            continue
+        j = min(candidates, key=lambda j: abs(stamps[j] - z_ts))
+        if abs(stamps[j] - z_ts) <= tolerance:
+            joined.append({"zabbix": item, "hyphenmon": samples[j]})
+    return joined
@@ -0,0 +1,75 @@
+import heapq
+
+import numpy as np
+
+from asof import asof_merge
+
+
+def to_matrix(series, start, end, step, tolerance=None, direction="backward"):
+    # Samples every (timestamps, values) series in `series` on one time grid;
+    # returns the names and an (n_series, n_points) array with NaN gaps.
+    grid = np.arange(start, end + step / 2, step, dtype=np.float64)
+    tolerance = step if tolerance is None else tolerance
+    names = list(series)
+    matrix = np.full((len(names), len(grid)), np.nan)
+    for row, name in enumerate(names):
+        ts, values = series[name]
+        matrix[row] = asof_merge(grid, np.zeros(len(grid)), ts, values, tolerance, direction)[2]
+    return names, matrix
+
+
+def normalize(values, dtype=np.float32):
+    # Centers each row and scales it to unit length, so the dot product of
+    # two rows is their Pearson correlation. Gaps (NaN) are filled with the
+    # row mean and so add nothing. Rows with fewer than two samples or zero
+    # variance are marked invalid.
+    x = np.array(values, dtype=np.float64)
+    missing = np.isnan(x)
+    counts = (~missing).sum(axis=1)
+    means = np.where(counts > 0, np.nansum(x, axis=1) / np.maximum(counts, 1), 0.0)[:, None]
+    x = np.where(missing, means, x) - means
+    norms = np.sqrt((x * x).sum(axis=1))
+    valid = (counts > 1) & (norms > 0) & np.isfinite(norms)
+    x[valid] /= norms[valid, None]
+    x[~valid] = 0.0
+    return x.astype(dtype), valid
+
+
+def top_correlated_pairs(values, k=100, block_size=1024, min_abs=0.0, names=None, dtype=np.float32):
+    # All-pairs correlation by blocked matrix multiplication on normalized
+    # rows. Only one block_size x block_size tile of the correlation matrix
+    # exists at a time and each tile contributes at most k candidates, so the
+    # result is the k strongest pairs by |r| (above min_abs) as a sorted list
+    # of (name_i, name_j, r).
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k!r}")
+    z, valid = normalize(values, dtype)
+    index = np.flatnonzero(valid)
+    z = z[index]
+    n = len(index)
+    names = list(range(len(valid))) if names is None else list(names)
+    heap = []
+    for i0 in range(0, n, block_size):
+        a = z[i0:i0 + block_size]
+        for j0 in range(i0, n, block_size):
+            c = np.abs(a @ z[j0:j0 + block_size].T)
+            if j0 == i0:
+                # diagonal tile: keep the strict upper triangle only
+                c = np.triu(c, 1)
+            threshold = max(min_abs, heap[0][0] if len(heap) == k else 0.0)
+            flat = c.ravel()
+            take = min(k, flat.size)
+            candidates = np.argpartition(flat, flat.size - take)[flat.size - take:]
+            for flat_index in candidates[flat[candidates] > threshold]:
+                r_abs = float(flat[flat_index])
+                bi, bj = divmod(int(flat_index), c.shape[1])
+                entry = (r_abs, i0 + bi, j0 + bj)
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif r_abs > heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+    result = []
+    for r_abs, i, j in sorted(heap, reverse=True):
+        r = float(z[i].astype(np.float64) @ z[j].astype(np.float64))
+        result.append((names[index[i]], names[index[j]], r))
+    return result
@@ -0,0 +1,115 @@
+import math
+from collections import deque
+
+
+class RollingCorrelation:
+    # Pearson correlation over the last `window` (x, y) pairs, or over all of
+    # them when window is None. Means and co-moments are kept with Welford's
+    # updates; the oldest pair leaves the window through the inverse update,
+    # so every sample costs O(1). Sums are rebuilt from the window every
+    # `window * 16` updates to keep rounding error from accumulating.
+    def __init__(self, window=None):
+        self.window = window
+        self._pairs = deque() if window else None
+        self._updates = 0
+        self._reset()
+
+    def _reset(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def _add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.n
+        dy = y - self.mean_y
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def _remove(self, x, y):
+        if self.n <= 1:
+            self._reset()
+            return
+        n = self.n - 1
+        mean_x = (self.n * self.mean_x - x) / n
+        mean_y = (self.n * self.mean_y - y) / n
+        self.m2_x -= (x - mean_x) * (x - self.mean_x)
+        self.m2_y -= (y - mean_y) * (y - self.mean_y)
+        self.c_xy -= (x - mean_x) * (y - self.mean_y)
+        self.n, self.mean_x, self.mean_y = n, mean_x, mean_y
+
+    def add(self, x, y):
+        if self._pairs is not None:
+            if len(self._pairs) == self.window:
+                self._remove(*self._pairs.popleft())
+                if self.n == 1:
+                    # the inverse update leaves rounding residue in the
+                    # moments, which a single pair can't have
+                    self._reset()
+                    self._add(*self._pairs[0])
+            self._pairs.append((x, y))
+            self._updates += 1
+            if self._updates >= self.window * 16:
+                self._updates = 0
+                self._reset()
+                for px, py in self._pairs:
+                    self._add(px, py)
+                return
+        self._add(x, y)
+
+    @property
+    def covariance(self):
+        return self.c_xy / (self.n - 1) if self.n > 1 else None
+
+    @property
+    def correlation(self):
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return max(-1.0, min(1.0, self.c_xy / math.sqrt(self.m2_x * self.m2_y)))
+
+
+class PairTracker:
+    # Tracks RollingCorrelation for configured pairs of (source, metric)
+    # series. It accepts the aggregator's (source, metric, ts, value) samples,
+    # so it can be used as an aggregator sink. A pair is updated when both of
+    # its series have a sample newer than the ones used last, no more than
+    # `tolerance` seconds apart.
+    def __init__(self, pairs, window=360, tolerance=10):
+        self.tolerance = tolerance
+        self.correlations = {}
+        self._by_series = {}
+        self._latest = {}
+        self._used = {}
+        for x, y in pairs:
+            pair = (tuple(x), tuple(y))
+            self.correlations[pair] = RollingCorrelation(window)
+            self._by_series.setdefault(pair[0], []).append(pair)
+            self._by_series.setdefault(pair[1], []).append(pair)
+
+    def write(self, samples):
+        for source, metric, ts, value in samples:
+            series = (source, metric)
+            pairs = self._by_series.get(series)
+            if not pairs:
+                continue
+            self._latest[series] = (ts, value)
+            for pair in pairs:
+                x = self._latest.get(pair[0])
+                y = self._latest.get(pair[1])
+                if x is None or y is None or abs(x[0] - y[0]) > self.tolerance:
+                    continue
+                used = self._used.get(pair)
+                if used is not None and (x[0] <= used[0] or y[0] <= used[1]):
+                    continue
+                self._used[pair] = (x[0], y[0])
+                self.correlations[pair].add(x[1], y[1])
+
+    def correlation(self, x, y):
+        rolling = self.correlations.get((tuple(x), tuple(y)))
+        return rolling.correlation if rolling is not None else None
+
+    def snapshot(self):
+        return {pair: rolling.correlation for pair, rolling in self.correlations.items()}
@@ -0,0 +1,124 @@
+import heapq
+import itertools
+from bisect import bisect_left, insort
+
+
+class StreamingCorrelator:
+    # Joins timestamped events from several sources as they arrive. Every
+    # event of the first (anchor) source is matched with the nearest event of
+    # each other source within `tolerance` seconds that has the same key or
+    # no key at all: unkeyed events of the other sources (e.g. one hyphenmon
+    # stream next to per-item Zabbix keys) are shared by every key.
+    #
+    # The watermark trails the slowest source's newest timestamp by
+    # `allowed_lateness`; events older than the watermark are late and
+    # dropped. An anchor is emitted once the watermark passes ts + tolerance,
+    # since no acceptable event can match it after that, and events that can
+    # no longer match any anchor are evicted, so memory stays bounded by the
+    # lateness window. Pending anchors and keyed events sit in heaps ordered
+    # by time, so each event costs O(log n) however many keys there are.
+    def __init__(self, sources=("zabbix", "hyphenmon"), tolerance=10, allowed_lateness=30):
+        self.sources = tuple(sources)
+        self.anchor = self.sources[0]
+        self.tolerance = tolerance
+        self.allowed_lateness = allowed_lateness
+        self.watermark = float("-inf")
+        self.late = 0
+        self.unmatched = 0
+        self._newest = {}
+        self._anchors = []
+        self._windows = {}
+        self._shared = {source: [] for source in self.sources[1:]}
+        self._expiry = []
+        self._seq = itertools.count()
+
+    def push(self, source, ts, payload, key=None):
+        if source not in self.sources:
+            raise ValueError(f"Unknown source {source!r}, expected one of {self.sources}")
+        if ts < self.watermark:
+            self.late += 1
+            return []
+        # the sequence number keeps heaps and insort from ever comparing
+        # keys or payloads
+        seq = next(self._seq)
+        if source == self.anchor:
+            heapq.heappush(self._anchors, (ts, seq, key, payload))
+        elif key is None:
+            insort(self._shared[source], (ts, seq, payload))
+        else:
+            insort(self._windows.setdefault(key, {}).setdefault(source, []), (ts, seq, payload))
+            heapq.heappush(self._expiry, (ts, seq, key, source))
+        if ts > self._newest.get(source, float("-inf")):
+            self._newest[source] = ts
+        if len(self._newest) < len(self.sources):
+            return []
+        return self.advance_to(min(self._newest.values()) - self.allowed_lateness)
+
+    def advance_to(self, watermark):
+        # also usable with an external clock so an idle source can't stall
+        # the watermark
+        if watermark <= self.watermark:
+            return []
+        self.watermark = watermark
+        return self._emit(watermark - self.tolerance)
+
+    def flush(self):
+        # end of stream: emit every pending anchor and forget the rest
+        out = self._emit(float("inf"))
+        self._windows.clear()
+        self._expiry.clear()
+        for events in self._shared.values():
+            events.clear()
+        return out
+
+    def _emit(self, through):
+        # anchors up to `through` are complete; they leave the heap in
+        # timestamp order
+        out = []
+        while self._anchors and self._anchors[0][0] <= through:
+            ts, _, key, payload = heapq.heappop(self._anchors)
+            record = self._join(key, ts, payload)
+            if record is None:
+                self.unmatched += 1
+            else:
+                out.append(record)
+        self._evict()
+        return out
+
+    def _evict(self):
+        oldest = self._anchors[0][0] if self._anchors else self.watermark
+        cutoff = min(oldest, self.watermark) - self.tolerance
+        for events in self._shared.values():
+            del events[:bisect_left(events, (cutoff,))]
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, _, key, source = heapq.heappop(self._expiry)
+            window = self._windows.get(key)
+            if window is None or source not in window:
+                continue
+            events = window[source]
+            del events[:bisect_left(events, (cutoff,))]
+            if not events:
+                del window[source]
+                if not window:
+                    del self._windows[key]
+
+    def _join(self, key, ts, payload):
+        window = self._windows.get(key, {})
+        record = {"key": key, "timestamp": ts, self.anchor: payload}
+        for source in self.sources[1:]:
+            best = None
+            for events in (window.get(source, []), self._shared[source]):
+                i = bisect_left(events, (ts,))
+                for j in (i - 1, i):
+                    if 0 <= j < len(events):
+                        gap = abs(events[j][0] - ts)
+                        if gap <= self.tolerance and (best is None or gap < best[0]):
+                            best = (gap, events[j][2])
+            if best is None:
+                return None
+            record[source] = best[1]
+        return record
+
+    def pending(self):
+        keyed = sum(len(events) for window in self._windows.values() for events in window.values())
+        return len(self._anchors) + keyed + sum(len(events) for events in self._shared.values())
@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from asof import asof_indices, asof_join_many, asof_merge
+from engine import DIRECTIONS, align
+
+
+def _random_series(rng, n, end):
+    # integer timestamps, so exact ties and duplicates occur
+    ts = np.sort(rng.integers(0, end, size=n)).astype(np.float64)
+    return ts, rng.normal(size=n)
+
+
+@pytest.mark.parametrize("direction", DIRECTIONS)
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_engine_align(direction, seed):
+    rng = np.random.default_rng(seed)
+    ts, values = _random_series(rng, 200, 1000)
+    series = {"s": (list(ts), list(values))}
+    grid, aligned = align(series, step=3, tolerance=4, direction=direction, start=-10, end=1010)
+    _, _, matched = asof_merge(grid, np.zeros(len(grid)), ts, values, 4, direction)
+    expected = np.array([np.nan if v is None else v for v in aligned["s"]])
+    np.testing.assert_array_equal(matched, expected)
+
+
+def test_tolerance_and_empty_right():
+    left = [0.0, 10.0, 20.0]
+    assert asof_indices(left, [9.0, 21.0], 1, "backward").tolist() == [-1, 0, -1]
+    assert asof_indices(left, [9.0, 21.0], 1, "forward").tolist() == [-1, -1, 1]
+    assert asof_indices(left, [9.0, 21.0], 1, "nearest").tolist() == [-1, 0, 1]
+    assert asof_indices(left, [], 5).tolist() == [-1, -1, -1]
+
+
+def test_nearest_prefers_earlier_sample_on_ties():
+    assert asof_indices([5.0], [3.0, 7.0], 2, "nearest").tolist() == [0]
+
+
+def test_invalid_direction():
+    with pytest.raises(ValueError):
+        asof_indices([1.0], [1.0], 1, "sideways")
+
+
+def test_join_many():
+    base_ts = np.array([0.0, 10.0, 20.0])
+    base_values = np.array([1.0, 2.0, 3.0])
+    series = {"a": ([5.0, 15.0], [0.1, 0.2]), "b": ([25.0], [0.3])}
+    joined = asof_join_many(series, base_ts, base_values, tolerance=5)
+    np.testing.assert_array_equal(joined["a"][2], [1.0, 2.0])
+    np.testing.assert_array_equal(joined["b"][2], [3.0])
+    joined = asof_join_many(series, base_ts, base_values, tolerance=4)
+    assert np.isnan(joined["b"][2]).all()
@@ -0,0 +1,66 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from matrix import normalize, top_correlated_pairs
+
+
+def _brute_force(values, k, min_abs=0.0):
+    r = np.corrcoef(values)
+    pairs = [
+        (i, j, r[i, j])
+        for i in range(len(values))
+        for j in range(i + 1, len(values))
+        if abs(r[i, j]) > min_abs
+    ]
+    pairs.sort(key=lambda p: abs(p[2]), reverse=True)
+    return pairs[:k]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64])
+def test_matches_brute_force(block_size):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(50, 40))
+    values[1] = 2 * values[0] + rng.normal(scale=0.1, size=40)
+    values[2] = -values[3] + rng.normal(scale=0.1, size=40)
+    expected = _brute_force(values, 20)
+    result = top_correlated_pairs(values, k=20, block_size=block_size)
+    assert [(i, j) for i, j, _ in result] == [(i, j) for i, j, _ in expected]
+    assert [r for _, _, r in result] == pytest.approx([r for _, _, r in expected])
+
+
+def test_min_abs_and_names():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(30, 60))
+    names = [f"s{i}" for i in range(30)]
+    expected = _brute_force(values, 100, min_abs=0.3)
+    result = top_correlated_pairs(values, k=100, block_size=8, min_abs=0.3, names=names)
+    assert [(a, b) for a, b, _ in result] == [(names[i], names[j]) for i, j, _ in expected]
+
+
+def test_invalid_rows_are_skipped():
+    values = np.array(
+        [
+            [1.0, 2.0, 3.0, 4.0],
+            [5.0, 5.0, 5.0, 5.0],
+            [np.nan, np.nan, np.nan, 1.0],
+            [2.0, 4.0, 6.0, 8.5],
+        ]
+    )
+    z, valid = normalize(values)
+    assert valid.tolist() == [True, False, False, True]
+    assert not z[1].any() and not z[2].any()
+    result = top_correlated_pairs(values, k=5)
+    assert [(i, j) for i, j, _ in result] == [(0, 3)]
+
+
+def test_gaps_are_filled_with_row_mean():
+    values = np.array([[1.0, np.nan, 3.0, 4.0], [2.0, 9.0, 6.0, 8.0]])
+    filled = np.array([[1.0, 8.0 / 3, 3.0, 4.0], [2.0, 9.0, 6.0, 8.0]])
+    ((_, _, r),) = top_correlated_pairs(values, k=1)
+    assert r == pytest.approx(np.corrcoef(filled)[0, 1])
+
+
+def test_k_must_be_positive():
+    with pytest.raises(ValueError):
+        top_correlated_pairs(np.ones((3, 3)), k=0)
@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from rolling import PairTracker, RollingCorrelation
+
+
+@pytest.mark.parametrize("window", [None, 2, 25])
+def test_matches_corrcoef(window):
+    rng = np.random.default_rng(0)
+    x = rng.normal(loc=1e4, scale=10, size=1000)
+    y = 0.5 * x + rng.normal(scale=5, size=1000)
+    rolling = RollingCorrelation(window)
+    for n in range(len(x)):
+        rolling.add(x[n], y[n])
+        lo = 0 if window is None else max(0, n + 1 - window)
+        if n - lo < 1:
+            assert rolling.correlation is None
+            continue
+        xs, ys = x[lo:n + 1], y[lo:n + 1]
+        assert rolling.correlation == pytest.approx(np.corrcoef(xs, ys)[0, 1], abs=1e-9)
+        assert rolling.covariance == pytest.approx(np.cov(xs, ys)[0, 1], rel=1e-7)
+
+
+def test_constant_series_has_no_correlation():
+    rolling = RollingCorrelation(10)
+    for i in range(20):
+        rolling.add(float(i), 3.0)
+    assert rolling.correlation is None
+
+
+def test_pair_tracker_matches_new_samples_within_tolerance():
+    cpu, latency = ("zabbix", "cpu"), ("app", "latency")
+    tracker = PairTracker([(cpu, latency)], window=None, tolerance=5)
+    tracker.write([("zabbix", "cpu", 0, 1.0), ("app", "latency", 2, 10.0)])
+    # a repeated sample of one series doesn't count the pair again
+    tracker.write([("app", "latency", 2, 10.0)])
+    # too far apart
+    tracker.write([("zabbix", "cpu", 20, 5.0), ("app", "latency", 3, 0.0)])
+    tracker.write([("app", "latency", 21, 30.0), ("zabbix", "other", 21, 7.0)])
+    tracker.write([("zabbix", "cpu", 30, 3.0), ("app", "latency", 31, 20.0)])
+    assert tracker.correlations[(cpu, latency)].n == 3
+    assert tracker.correlation(cpu, latency) == pytest.approx(np.corrcoef([1, 5, 3], [10, 30, 20])[0, 1])
+    assert tracker.snapshot() == {(cpu, latency): tracker.correlation(cpu, latency)}
+    assert tracker.correlation(latency, cpu) is None
@@ -1,17 +1,242 @@
-import requests
-from zabbix_client import ZabbixClient
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
+import config
+from collectors import CollectorRegistry
+from ring_buffer import SampleHistory
+from rolling import PairTracker
+from samples import iter_samples
+from scheduler import FixedRateScheduler
+from sharding import merge_results, shard_sources
 
-def fetch_hyphenmon():
-    return requests.get("http://localhost:5001/metrics").json()
+log = logging.getLogger(__name__)
 
+registry = CollectorRegistry.from_config(config.SOURCES)
+_executor = ThreadPoolExecutor(max_workers=config.FETCH_WORKERS, thread_name_prefix="fetch")
+_inflight = {}
+# newest timestamp passed to the sinks per (source, metric)
+_last_ts = {}
 
-def aggregate():
-    zabbix = ZabbixClient("http://192.168.1.7/api_jsonrpc.php", "Admin", "zabbix")
-    z_data = zabbix.get_items("10105")  
-    h_data = fetch_hyphenmon()
-    return {"zabbix": z_data, "hyphenmon": h_data}
+# recent samples per (source, metric); sinks receive the samples of every
+# source polled in a cycle, and the in-memory ones are also refilled from the
+# sample log on startup
+history = SampleHistory(config.HISTORY_CAPACITY)
+correlations = PairTracker(config.CORRELATION_PAIRS, window=config.CORRELATION_WINDOW)
+memory_sinks = [history, correlations]
+
+if config.TIMESERIES_STORE:
+    from timeseries_store import TimeSeriesStore
+
+    store = TimeSeriesStore(retention=config.TIMESERIES_RETENTION)
+    memory_sinks.append(store)
+
+sinks = list(memory_sinks)
+
+if config.POSTGRES_DSN:
+    from pg_sink import MetricsWriter
+
+    sinks.append(
+        MetricsWriter.from_dsn(
+            config.POSTGRES_DSN,
+            table=config.POSTGRES_TABLE,
+            batch_size=config.POSTGRES_BATCH_SIZE,
+            flush_interval=config.POSTGRES_FLUSH_INTERVAL,
+        )
+    )
+
+
+def attach_sample_log(path):
+    # Recent history is recovered from disk into the in-memory sinks before
+    # the log itself starts receiving new samples.
+    from sample_log import SampleLog
+
+    sample_log = SampleLog(
+        path, segment_bytes=config.SAMPLE_LOG_SEGMENT_BYTES, max_segments=config.SAMPLE_LOG_SEGMENTS
+    )
+    since = time.time() - config.SAMPLE_LOG_REPLAY_SECONDS
+    sample_log.replay(memory_sinks, since)
+    sinks.append(sample_log)
+    return sample_log
+
+
+def close_sinks():
+    for sink in sinks:
+        close = getattr(sink, "close", None)
+        if close is not None:
+            close()
+
+
+def use_sources(sources):
+    global registry
+    registry = CollectorRegistry.from_config(sources)
+    _inflight.clear()
+
+
+def _new_samples(samples):
+    # Every poll returns all items, including those whose lastclock didn't
+    # move; only samples newer than the last one of their series reach the
+    # sinks, so append-only sinks (Postgres, the sample log) get no
+    # duplicate rows.
+    for sample in samples:
+        series = (sample[0], sample[1])
+        if sample[2] > _last_ts.get(series, float("-inf")):
+            _last_ts[series] = sample[2]
+            yield sample
+
+
+def aggregate(now=None):
+    start = time.monotonic()
+    now = start if now is None else now
+    polled = []
+    for collector in registry.due(now):
+        # a source still hung from an earlier cycle is not submitted again
+        if collector.name not in _inflight or _inflight[collector.name].done():
+            _inflight[collector.name] = _executor.submit(collector.collect)
+            collector.next_run = now + collector.interval
+            polled.append(collector)
+    errors = {}
+    for collector in polled:
+        remaining = start + collector.timeout - time.monotonic()
+        try:
+            collector.last_result = _inflight[collector.name].result(timeout=max(remaining, 0))
+            collector.next_run = now + collector.observe(collector.last_result)
+        except TimeoutError:
+            collector.last_result = None
+            errors[collector.name] = "timed out"
+        except Exception as e:
+            collector.last_result = None
+            errors[collector.name] = repr(e)
+    for name, error in errors.items():
+        log.warning("source %s failed: %s", name, error)
+    samples = list(_new_samples(iter_samples({c.name: c.last_result for c in polled})))
+    for sink in sinks:
+        try:
+            sink.write(samples)
+        except Exception:
+            log.exception("sink %s failed", type(sink).__name__)
+    result = {collector.name: collector.last_result for collector in registry}
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def run_daemon(interval=config.DAEMON_INTERVAL, jitter=config.DAEMON_JITTER):
+    # Collectors, their clients and pooled connections stay alive between
+    # cycles; each collector is still polled only when its own interval is due.
+    scheduler = FixedRateScheduler(interval, jitter=jitter)
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    scheduler.run(lambda now: print(aggregate(now), flush=True))
+    close_sinks()
+
+
+def _aggregate_shard(shard):
+    shard_index, num_shards = shard
+    use_sources(shard_sources(config.SOURCES, shard_index, num_shards))
+    if config.SAMPLE_LOG_DIR:
+        attach_sample_log(os.path.join(config.SAMPLE_LOG_DIR, f"shard-{shard_index}"))
+    try:
+        return aggregate()
+    finally:
+        close_sinks()
+
+
+def _shard_worker(shard_index, num_shards, interval, jitter, results):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    use_sources(shard_sources(config.SOURCES, shard_index, num_shards))
+    if config.SAMPLE_LOG_DIR:
+        attach_sample_log(os.path.join(config.SAMPLE_LOG_DIR, f"shard-{shard_index}"))
+    scheduler = FixedRateScheduler(interval, jitter=jitter)
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    scheduler.run(lambda now: results.put((shard_index, aggregate(now))))
+    close_sinks()
+
+
+def run_sharded(workers):
+    with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+        return merge_results(pool.map(_aggregate_shard, [(i, workers) for i in range(workers)]))
+
+
+def run_sharded_daemon(workers, interval=config.DAEMON_INTERVAL, jitter=config.DAEMON_JITTER):
+    # Each worker process polls its own shard of the sources on its own
+    # scheduler; the parent prints a merged snapshot once every shard has
+    # reported since the previous one.
+    results = multiprocessing.Queue(maxsize=workers * 4)
+    procs = [
+        multiprocessing.Process(target=_shard_worker, args=(i, workers, interval, jitter, results), daemon=True)
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    latest, fresh = {}, set()
+    while not stop.is_set():
+        try:
+            shard_index, result = results.get(timeout=1)
+        except queue.Empty:
+            continue
+        latest[shard_index] = result
+        fresh.add(shard_index)
+        if len(fresh) == workers:
+            print(merge_results(latest.values()), flush=True)
+            fresh.clear()
+    # SIGTERM lets each worker finish its tick and close its sinks; results
+    # are drained meanwhile, since a worker can't exit while its queue feeder
+    # still holds data or a put is blocked on the full queue
+    for proc in procs:
+        proc.terminate()
+    while any(proc.is_alive() for proc in procs):
+        try:
+            results.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    for proc in procs:
+        proc.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate Zabbix and hyphenmon metrics")
+    parser.add_argument("--daemon", action="store_true", help="keep running and aggregate on a fixed rate")
+    parser.add_argument("--interval", type=float, default=config.DAEMON_INTERVAL, help="seconds between ticks")
+    parser.add_argument("--jitter", type=float, default=config.DAEMON_JITTER, help="max random delay per tick")
+    parser.add_argument("--workers", type=int, default=1, help="shard sources across this many processes")
+    parser.add_argument("--shard-index", type=int, help="only poll this shard of the sources")
+    parser.add_argument("--num-shards", type=int, help="total number of shards when using --shard-index")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    sample_log_dir = config.SAMPLE_LOG_DIR
+    if args.shard_index is not None:
+        if not args.num_shards:
+            parser.error("--shard-index requires --num-shards")
+        if args.workers > 1:
+            parser.error("--shard-index can't be combined with --workers > 1")
+        use_sources(shard_sources(config.SOURCES, args.shard_index, args.num_shards))
+        # shard instances may share a host, so each keeps its own log like
+        # the --workers processes do
+        if sample_log_dir:
+            sample_log_dir = os.path.join(sample_log_dir, f"shard-{args.shard_index}")
+    if sample_log_dir and args.workers <= 1:
+        attach_sample_log(sample_log_dir)
+    if args.workers > 1:
+        if args.daemon:
+            run_sharded_daemon(args.workers, args.interval, args.jitter)
+        else:
+            print(run_sharded(args.workers))
+    elif args.daemon:
+        run_daemon(args.interval, args.jitter)
+    else:
+        print(aggregate())
+        close_sinks()
 
 
 if __name__ == "__main__":
-    print(aggregate())
+    main()
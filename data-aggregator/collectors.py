@@ -0,0 +1,150 @@
+import threading
+
+import json_codec
+import requests
+from zabbix_client import ZabbixClient
+
+ITEM_FIELDS = ["itemid", "key_", "delay", "lastclock", "lastvalue"]
+
+COLLECTOR_TYPES = {}
+
+_zabbix_clients = {}
+_zabbix_clients_lock = threading.Lock()
+_http = requests.Session()
+
+
+def register(type_name):
+    def decorator(cls):
+        cls.type = type_name
+        COLLECTOR_TYPES[type_name] = cls
+        return cls
+
+    return decorator
+
+
+def get_zabbix(url, user, password):
+    # collectors pointing at the same server share one client and its session
+    key = (url, user)
+    with _zabbix_clients_lock:
+        if key not in _zabbix_clients:
+            _zabbix_clients[key] = ZabbixClient(url, user, password)
+        return _zabbix_clients[key]
+
+
+class Collector:
+    type = None
+
+    # With adaptive={"min_interval": ..., "max_interval": ...} the polling
+    # interval shrinks by `speedup` whenever the collected values changed
+    # since the previous poll and grows by `slowdown` while they stay the same.
+    def __init__(self, name, interval=30, timeout=10, adaptive=None):
+        self.name = name
+        self.interval = interval
+        self.timeout = timeout
+        self.adaptive = adaptive
+        self.next_run = 0.0
+        self.last_result = None
+        self._fingerprint = None
+
+    def due(self, now):
+        return now >= self.next_run
+
+    def collect(self):
+        raise NotImplementedError
+
+    def fingerprint(self, result):
+        return result
+
+    def min_interval(self, result):
+        return self.adaptive.get("min_interval", 1)
+
+    def observe(self, result):
+        if not self.adaptive or result is None:
+            return self.interval
+        fingerprint = self.fingerprint(result)
+        changed = fingerprint != self._fingerprint
+        self._fingerprint = fingerprint
+        if changed:
+            interval = self.interval * self.adaptive.get("speedup", 0.5)
+        else:
+            interval = self.interval * self.adaptive.get("slowdown", 1.5)
+        lower = self.min_interval(result)
+        upper = max(self.adaptive.get("max_interval", 600), lower)
+        self.interval = min(max(interval, lower), upper)
+        return self.interval
+
+
+@register("zabbix")
+class ZabbixCollector(Collector):
+    def __init__(self, name, url, user, password, hostids, output=ITEM_FIELDS, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.user = user
+        self.password = password
+        self.hostids = hostids
+        self.output = output
+
+    def collect(self):
+        client = get_zabbix(self.url, self.user, self.password)
+        if isinstance(self.hostids, str):
+            return client.get_items(self.hostids, output=self.output, records=True)
+        return client.get_items_many(self.hostids, output=self.output, records=True)
+
+    def _items(self, result):
+        if isinstance(result, dict):
+            return [item for items in result.values() for item in items]
+        return result
+
+    def fingerprint(self, result):
+        return [(item.itemid, item.lastvalue) for item in self._items(result)]
+
+    def min_interval(self, result):
+        # polling faster than Zabbix collects the fastest item can't see
+        # anything new
+        delays = [item.delay for item in self._items(result) if item.delay]
+        return max(super().min_interval(result), min(delays, default=0))
+
+
+@register("hyphenmon")
+class HyphenmonCollector(Collector):
+    def __init__(self, name, url, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+
+    def collect(self):
+        return json_codec.loads(_http.get(self.url, timeout=self.timeout).content)
+
+    def fingerprint(self, result):
+        return {k: v for k, v in result.items() if k != "timestamp"}
+
+
+class CollectorRegistry:
+    def __init__(self, collectors=()):
+        self.collectors = {}
+        for collector in collectors:
+            self.add(collector)
+
+    @classmethod
+    def from_config(cls, sources):
+        collectors = []
+        for spec in sources:
+            spec = dict(spec)
+            type_name = spec.pop("type")
+            if type_name not in COLLECTOR_TYPES:
+                raise ValueError(f"Unknown collector type {type_name!r} for source {spec.get('name')!r}")
+            collectors.append(COLLECTOR_TYPES[type_name](**spec))
+        return cls(collectors)
+
+    def add(self, collector):
+        if collector.name in self.collectors:
+            raise ValueError(f"Duplicate source name {collector.name!r}")
+        self.collectors[collector.name] = collector
+
+    def due(self, now):
+        return [c for c in self.collectors.values() if c.due(now)]
+
+    def __iter__(self):
+        return iter(self.collectors.values())
+
+    def __len__(self):
+        return len(self.collectors)
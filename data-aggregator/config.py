@@ -0,0 +1,71 @@
+ZABBIX_URL = "http://192.168.1.7/api_jsonrpc.php"
+ZABBIX_USER = "Admin"
+ZABBIX_PASSWORD = "zabbix"
+
+# Every source is polled on its own interval (seconds). aggregate() waits at
+# most `timeout` seconds for a source before returning without it. Zabbix
+# sources take a single hostid (result is a list of items) or a list of
+# hostids fetched in batches (result is a dict keyed by hostid). Sources with
+# "adaptive" bounds poll faster while their values change and back off while
+# they don't; Zabbix sources never go below their fastest item's delay.
+SOURCES = [
+    {
+        "name": "zabbix",
+        "type": "zabbix",
+        "url": ZABBIX_URL,
+        "user": ZABBIX_USER,
+        "password": ZABBIX_PASSWORD,
+        "hostids": "10105",
+        "interval": 30,
+        "timeout": 10,
+        "adaptive": {"min_interval": 10, "max_interval": 300},
+    },
+    {
+        "name": "hyphenmon",
+        "type": "hyphenmon",
+        "url": "http://localhost:5001/metrics",
+        "interval": 10,
+        "timeout": 5,
+    },
+]
+
+FETCH_WORKERS = 8
+
+# --daemon mode: seconds between scheduler ticks and max random delay per tick
+DAEMON_INTERVAL = 5
+DAEMON_JITTER = 0.5
+
+# samples kept in memory per (source, metric)
+HISTORY_CAPACITY = 720
+
+# columnar NumPy store for longer history (requires numpy)
+TIMESERIES_STORE = False
+TIMESERIES_RETENTION = 7 * 24 * 3600
+
+# append-only on-disk sample log, disabled when None; the last
+# SAMPLE_LOG_REPLAY_SECONDS are loaded back into memory on startup
+SAMPLE_LOG_DIR = None
+SAMPLE_LOG_SEGMENT_BYTES = 64 * 1024 * 1024
+SAMPLE_LOG_SEGMENTS = 64
+SAMPLE_LOG_REPLAY_SECONDS = 3600
+
+# bulk writer into PostgreSQL for the Grafana dashboard (requires psycopg2),
+# disabled when None; e.g. "dbname=monitoring user=grafana host=localhost"
+POSTGRES_DSN = None
+POSTGRES_TABLE = "metric_samples"
+POSTGRES_BATCH_SIZE = 5000
+POSTGRES_FLUSH_INTERVAL = 5.0
+
+# monitor_pipeline: worker threads per stage and bound of each stage's queue
+PIPELINE_WORKERS = {"correlate": 2, "detect": 2, "alert": 1}
+PIPELINE_QUEUE_SIZE = 100
+# seconds the pipeline gets to drain on shutdown before stuck stages are
+# abandoned
+PIPELINE_CLOSE_TIMEOUT = 30
+
+# (source, metric) pairs whose rolling Pearson correlation is tracked live
+# over the last CORRELATION_WINDOW matched samples
+CORRELATION_PAIRS = [
+    (("zabbix", "system.cpu.util"), ("hyphenmon", "response_time_ms")),
+]
+CORRELATION_WINDOW = 360
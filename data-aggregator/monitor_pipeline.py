@@ -0,0 +1,125 @@
+import logging
+import queue
+import signal
+
+import config
+from aggregator import aggregate, close_sinks
+from alert import send_alert
+from detect import detect_anomalies
+from engine import correlate_all
+from pipeline import Pipeline, Stage
+from scheduler import FixedRateScheduler
+
+log = logging.getLogger(__name__)
+
+
+def _is_sample(data):
+    # hyphenmon-style results are one timestamped sample, Zabbix results a
+    # list of items or a dict of hostid -> items
+    return isinstance(data, dict) and "timestamp" in data
+
+
+def _items(data):
+    if isinstance(data, dict):
+        return [item for items in data.values() for item in items]
+    return list(data)
+
+
+class _FreshResults:
+    # aggregate() reports the last result of every source, including sources
+    # that weren't polled this tick. Samples and items already passed on (same
+    # timestamp or lastclock) are not marked new again, so the pipeline never
+    # correlates or alerts on the same data twice.
+    def __init__(self):
+        self._seen = {}
+
+    def __call__(self, result):
+        new, latest = {}, {}
+        for name, data in result.items():
+            if name == "errors" or not data:
+                continue
+            latest[name] = data
+            if _is_sample(data):
+                if self._seen.get(name) != data["timestamp"]:
+                    self._seen[name] = data["timestamp"]
+                    new[name] = data
+                continue
+            seen = self._seen.setdefault(name, {})
+            items = []
+            for item in _items(data):
+                if seen.get(item.get("itemid")) != item.get("lastclock"):
+                    seen[item.get("itemid")] = item.get("lastclock")
+                    items.append(item)
+            if items:
+                new[name] = items
+        return {"new": new, "latest": latest} if new else None
+
+
+def _correlate(batch):
+    # every item source is joined with every sample source; each join needs
+    # at least one side that is new this tick
+    new, latest = batch["new"], batch["latest"]
+    samples = [name for name, data in latest.items() if _is_sample(data)]
+    joined = []
+    for name, data in latest.items():
+        if _is_sample(data):
+            continue
+        fresh = new.get(name, [])
+        fresh_ids = {id(item) for item in fresh}
+        old = [item for item in _items(data) if id(item) not in fresh_ids]
+        for sample_name in samples:
+            joined += correlate_all(fresh, latest[sample_name])
+            if sample_name in new:
+                joined += correlate_all(old, new[sample_name])
+    return joined or None
+
+
+def _alert(message):
+    send_alert("Monitoring alert", message)
+
+
+def build_pipeline(workers=config.PIPELINE_WORKERS, queue_size=config.PIPELINE_QUEUE_SIZE):
+    return Pipeline(
+        [
+            Stage(
+                "correlate", _correlate, workers=workers.get("correlate", 1), queue_size=queue_size, flatten=True
+            ),
+            Stage("detect", detect_anomalies, workers=workers.get("detect", 1), queue_size=queue_size, flatten=True),
+            Stage("alert", _alert, workers=workers.get("alert", 1), queue_size=queue_size),
+        ]
+    )
+
+
+def run(interval=config.DAEMON_INTERVAL, jitter=config.DAEMON_JITTER):
+    # aggregate() feeds the pipeline on the scheduler thread with the data
+    # that is new since the previous tick; if the pipeline is full the put
+    # blocks, the scheduler skips ticks and polling slows down instead of
+    # results piling up in memory. The put gives up once the scheduler is
+    # stopped, so a stuck stage can't keep SIGTERM from ending the process.
+    pipeline = build_pipeline()
+    fresh = _FreshResults()
+
+    def tick(now):
+        batch = fresh(aggregate(now))
+        while batch is not None and not scheduler.stopped:
+            try:
+                pipeline.put(batch, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    scheduler = FixedRateScheduler(interval, jitter=jitter)
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    pipeline.start()
+    try:
+        scheduler.run(tick)
+    finally:
+        pipeline.close(timeout=config.PIPELINE_CLOSE_TIMEOUT)
+        close_sinks()
+        log.info("pipeline stopped: %s", pipeline.stats())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run()
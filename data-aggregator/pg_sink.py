@@ -0,0 +1,175 @@
+import io
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+log = logging.getLogger(__name__)
+
+CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+    ts timestamptz NOT NULL,
+    source text NOT NULL,
+    metric text NOT NULL,
+    value double precision NOT NULL
+)"""
+CREATE_INDEX = "CREATE INDEX IF NOT EXISTS {table}_series_ts ON {table} (source, metric, ts)"
+
+# rows per multi-row INSERT, keeps SQLite under its bound-parameter limit
+INSERT_ROWS = 200
+
+
+def _copy_text(value):
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class SingleConnectionPool:
+    # minimal getconn/putconn pool around one connection, for drivers such as
+    # sqlite3 that don't ship a pool
+    def __init__(self, connect):
+        self._connect = connect
+        self._conn = None
+
+    def getconn(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+            self._conn = None
+
+    def closeall(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class LazyPool:
+    # creates the wrapped pool on first use in each process, so a pool (and
+    # its sockets) is never shared across a fork or closed by another process
+    def __init__(self, create):
+        self._create = create
+        self._pool = None
+        self._pid = None
+
+    def _get(self):
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = self._create()
+            self._pid = os.getpid()
+        return self._pool
+
+    def getconn(self):
+        return self._get().getconn()
+
+    def putconn(self, conn, close=False):
+        self._get().putconn(conn, close=close)
+
+    def closeall(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.closeall()
+        self._pool = None
+
+
+class MetricsWriter:
+    # Buffers samples and writes them in bulk once batch_size rows are
+    # pending or flush_interval seconds have passed, using COPY when the
+    # driver supports it (psycopg2) and multi-row INSERTs otherwise.
+    def __init__(
+        self,
+        pool,
+        table="metric_samples",
+        batch_size=5000,
+        flush_interval=5.0,
+        max_pending=500000,
+        placeholder="%s",
+        create_table=True,
+    ):
+        self.pool = pool
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.placeholder = placeholder
+        self.create_table = create_table
+        self.dropped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_dsn(cls, dsn, minconn=1, maxconn=4, **kwargs):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        return cls(LazyPool(lambda: ThreadedConnectionPool(minconn, maxconn, dsn)), **kwargs)
+
+    def write(self, samples):
+        with self._lock:
+            self._pending.extend(samples)
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if not rows:
+                return
+            conn = self.pool.getconn()
+            try:
+                cur = conn.cursor()
+                if self.create_table:
+                    cur.execute(CREATE_TABLE.format(table=self.table))
+                    cur.execute(CREATE_INDEX.format(table=self.table))
+                if hasattr(cur, "copy_expert"):
+                    self._copy(cur, rows)
+                else:
+                    self._insert(cur, rows)
+                conn.commit()
+                self.create_table = False
+            except Exception:
+                # closing discards the failed transaction
+                self.pool.putconn(conn, close=True)
+                self._requeue(rows)
+                raise
+            self.pool.putconn(conn)
+
+    def _requeue(self, rows):
+        with self._lock:
+            self._pending[:0] = rows
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.dropped += overflow
+                log.warning("dropped %d unsent samples", overflow)
+
+    def _copy(self, cur, rows):
+        buf = io.StringIO()
+        for source, metric, ts, value in rows:
+            stamp = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+            buf.write(f"{stamp}\t{_copy_text(source)}\t{_copy_text(metric)}\t{value!r}\n")
+        buf.seek(0)
+        cur.copy_expert(f"COPY {self.table} (ts, source, metric, value) FROM STDIN", buf)
+
+    def _insert(self, cur, rows):
+        row_sql = f"({', '.join([self.placeholder] * 4)})"
+        for start in range(0, len(rows), INSERT_ROWS):
+            chunk = rows[start:start + INSERT_ROWS]
+            params = []
+            for source, metric, ts, value in chunk:
+                params += [datetime.fromtimestamp(ts, timezone.utc), source, metric, value]
+            sql = f"INSERT INTO {self.table} (ts, source, metric, value) VALUES {', '.join([row_sql] * len(chunk))}"
+            cur.execute(sql, params)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.pool.closeall()
@@ -0,0 +1,77 @@
+from array import array
+from bisect import bisect_left
+
+
+class RingBuffer:
+    # Every sample is stored twice, at i and i + capacity, so the latest n
+    # samples always form one contiguous slice and window() can return
+    # memoryviews into the buffer instead of copies.
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._ts = array("d", bytes(16 * capacity))
+        self._values = array("d", bytes(16 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def append(self, ts, value):
+        i = self._next
+        j = i + self.capacity
+        self._ts[i] = self._ts[j] = ts
+        self._values[i] = self._values[j] = value
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def latest(self):
+        if not self._count:
+            return None
+        i = self._next - 1 + self.capacity
+        return self._ts[i], self._values[i]
+
+    def window(self, n=None):
+        n = self._count if n is None else min(n, self._count)
+        end = self._next + self.capacity
+        return memoryview(self._ts)[end - n:end], memoryview(self._values)[end - n:end]
+
+    def window_since(self, ts):
+        timestamps, values = self.window()
+        start = bisect_left(timestamps, ts)
+        return timestamps[start:], values[start:]
+
+
+def _empty():
+    return memoryview(array("d")), memoryview(array("d"))
+
+
+class SampleHistory:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffers = {}
+
+    def write(self, samples):
+        for source, metric, ts, value in samples:
+            buf = self.buffers.get((source, metric))
+            if buf is None:
+                buf = self.buffers[(source, metric)] = RingBuffer(self.capacity)
+            else:
+                latest = buf.latest()
+                # unchanged Zabbix items report the same lastclock every poll
+                if latest is not None and ts <= latest[0]:
+                    continue
+            buf.append(ts, value)
+
+    def window(self, source, metric, n=None):
+        buf = self.buffers.get((source, metric))
+        return buf.window(n) if buf is not None else _empty()
+
+    def window_since(self, source, metric, ts):
+        buf = self.buffers.get((source, metric))
+        return buf.window_since(ts) if buf is not None else _empty()
+
+    def series(self):
+        return list(self.buffers)
@@ -0,0 +1,198 @@
+import mmap
+import os
+import struct
+
+# timestamp (float64), series id (uint64), value (float64), little endian
+RECORD = struct.Struct("<dQd")
+SERIES_FILE = "series.tsv"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+# written next to a full segment: the newest timestamp it holds
+MAX_TS_SUFFIX = ".max"
+
+
+class SampleLog:
+    # Append-only log of samples split into numbered segment files of
+    # fixed-width records. Series names are stored once in series.tsv and
+    # referenced by id, so records can be read back through mmap without any
+    # parsing beyond struct unpacking.
+    def __init__(self, path, segment_bytes=64 * 1024 * 1024, max_segments=None, fsync=False):
+        self.path = path
+        self.segment_bytes = segment_bytes - segment_bytes % RECORD.size
+        self.max_segments = max_segments
+        self.fsync = fsync
+        self.series = {}
+        self.names = []
+        self._file = None
+        self._max_ts = float("-inf")
+        self._series_file = None
+        os.makedirs(path, exist_ok=True)
+        self._load_series()
+
+    def _load_series(self):
+        path = os.path.join(self.path, SERIES_FILE)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # torn write: the id was never referenced by a record
+            os.truncate(path, complete)
+        for line in data[:complete].decode("utf-8").splitlines():
+            series_id, source, metric = line.split("\t")
+            self.series[(source, metric)] = int(series_id)
+            self.names.append((source, metric))
+
+    def segments(self):
+        names = sorted(
+            name for name in os.listdir(self.path) if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.path, name) for name in names]
+
+    def _open_segment(self):
+        segments = self.segments()
+        if segments and os.path.getsize(segments[-1]) < self.segment_bytes:
+            path = segments[-1]
+            # drop a partially written trailing record left by a crash
+            size = os.path.getsize(path)
+            if size % RECORD.size:
+                os.truncate(path, size - size % RECORD.size)
+            self._max_ts = self._scan_max_ts(path)
+        else:
+            number = int(segments[-1][-len(SEGMENT_SUFFIX) - 8:-len(SEGMENT_SUFFIX)]) + 1 if segments else 0
+            path = os.path.join(self.path, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+            segments.append(path)
+            self._max_ts = float("-inf")
+        if self.max_segments:
+            # max_segments full segments are kept besides the one being written
+            for old in segments[:-self.max_segments - 1]:
+                os.remove(old)
+                try:
+                    os.remove(self._max_ts_path(old))
+                except FileNotFoundError:
+                    pass
+        self._file = open(path, "ab")
+
+    def _series_id(self, source, metric):
+        series_id = self.series.get((source, metric))
+        if series_id is None:
+            if self._series_file is None:
+                self._series_file = open(os.path.join(self.path, SERIES_FILE), "a", encoding="utf-8")
+            series_id = self.series[(source, metric)] = len(self.names)
+            self.names.append((source, metric))
+            self._series_file.write(f"{series_id}\t{source}\t{metric}\n")
+        return series_id
+
+    def write(self, samples):
+        buf = bytearray()
+        max_ts = float("-inf")
+        for source, metric, ts, value in samples:
+            buf += RECORD.pack(ts, self._series_id(source, metric), value)
+            max_ts = max(max_ts, ts)
+        if not buf:
+            return
+        if self._series_file is not None:
+            self._series_file.flush()
+        if self._file is None:
+            self._open_segment()
+        self._max_ts = max(self._max_ts, max_ts)
+        self._file.write(buf)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if self._file.tell() >= self.segment_bytes:
+            self._file.close()
+            self._write_max_ts(self._file.name, self._max_ts)
+            self._open_segment()
+
+    def close(self):
+        for f in (self._file, self._series_file):
+            if f is not None:
+                f.close()
+        self._file = self._series_file = None
+
+    def _max_ts_path(self, path):
+        return path[:-len(SEGMENT_SUFFIX)] + MAX_TS_SUFFIX
+
+    def _write_max_ts(self, path, max_ts):
+        tmp = self._max_ts_path(path) + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(repr(max_ts))
+        os.replace(tmp, self._max_ts_path(path))
+
+    def _read_max_ts(self, path):
+        try:
+            with open(self._max_ts_path(path)) as f:
+                return float(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _scan_max_ts(self, path):
+        max_ts = float("-inf")
+        for view in self.scan(paths=[path]):
+            records = RECORD.iter_unpack(view)
+            try:
+                for ts, _, _ in records:
+                    max_ts = max(max_ts, ts)
+            finally:
+                del records
+        return max_ts
+
+    def scan(self, since=None, paths=None):
+        # yields a read-only memoryview over each segment's whole records.
+        # Timestamps are the sources' own clocks and don't increase through
+        # the log (stale Zabbix items repeat an old lastclock), so with
+        # `since` only full segments whose recorded newest timestamp is
+        # older are skipped; the segment being written is always read.
+        segments = self.segments() if paths is None else paths
+        if since is not None:
+            kept = []
+            for path in segments:
+                max_ts = self._read_max_ts(path)
+                if max_ts is None or max_ts >= since:
+                    kept.append(path)
+            segments = kept
+        for path in segments:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                size -= size % RECORD.size
+                if not size:
+                    continue
+                with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                    view = memoryview(mm)
+                    try:
+                        yield view
+                    finally:
+                        view.release()
+
+    def iter_records(self, since=None):
+        for view in self.scan(since):
+            records = RECORD.iter_unpack(view)
+            try:
+                for ts, series_id, value in records:
+                    if since is None or ts >= since:
+                        yield ts, series_id, value
+            finally:
+                # the mapping can only be closed once nothing references it
+                del records
+
+    def iter_samples(self, since=None):
+        names = self.names
+        for ts, series_id, value in self.iter_records(since):
+            source, metric = names[series_id]
+            yield source, metric, ts, value
+
+    def replay(self, sinks, since=None, batch_size=65536):
+        # one pass over the log, written to every sink in batches
+        batch = []
+        for sample in self.iter_samples(since):
+            batch.append(sample)
+            if len(batch) >= batch_size:
+                for sink in sinks:
+                    sink.write(batch)
+                batch = []
+        if batch:
+            for sink in sinks:
+                sink.write(batch)
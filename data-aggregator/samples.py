@@ -0,0 +1,38 @@
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _item_samples(source, items):
+    for item in items:
+        clock = item.get("lastclock", 0)
+        value = _number(item.get("lastvalue"))
+        if value is None or not int(clock):
+            continue
+        yield source, item.get("key_") or str(item.get("itemid")), float(clock), value
+
+
+def iter_samples(results):
+    # Flattens aggregate() results into (source, metric, timestamp, value)
+    # tuples. Zabbix items are keyed by item key; multi-host Zabbix sources
+    # become one source per host ("name:hostid").
+    for source, data in results.items():
+        if source == "errors" or not data:
+            continue
+        if isinstance(data, list):
+            yield from _item_samples(source, data)
+        elif "timestamp" in data:
+            ts = float(data["timestamp"])
+            for metric, value in data.items():
+                value = _number(value) if metric != "timestamp" else None
+                if value is not None:
+                    yield source, metric, ts, value
+        else:
+            for hostid, items in data.items():
+                yield from _item_samples(f"{source}:{hostid}", items)
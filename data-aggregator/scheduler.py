@@ -0,0 +1,48 @@
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class FixedRateScheduler:
+    # Runs a callback at start + k * interval. Ticks are anchored to the
+    # start time, so the time spent in the callback does not accumulate as
+    # drift. If a callback overruns one or more ticks, the missed ticks are
+    # skipped (or run back to back with catch_up=True).
+    def __init__(self, interval, jitter=0.0, catch_up=False, clock=time.monotonic):
+        self.interval = interval
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.clock = clock
+        self.missed = 0
+        self.ticks = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def run(self, callback):
+        start = self.clock()
+        tick = 0
+        while not self._stop.is_set():
+            scheduled = start + tick * self.interval
+            delay = scheduled + random.uniform(0, self.jitter) - self.clock()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            try:
+                callback(scheduled)
+            except Exception:
+                log.exception("scheduled run failed")
+            self.ticks += 1
+            tick += 1
+            behind = int((self.clock() - start) / self.interval) - tick
+            if behind > 0 and not self.catch_up:
+                self.missed += behind
+                log.warning("skipped %d missed tick(s)", behind)
+                tick += behind
@@ -0,0 +1,41 @@
+import hashlib
+
+
+def jump_hash(key, num_shards):
+    # Lamping & Veach jump consistent hash: when num_shards grows from N to
+    # N + 1 only 1 / (N + 1) of the keys move to the new shard.
+    k = int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "little")
+    b, j = -1, 0
+    while j < num_shards:
+        b = j
+        k = (k * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((k >> 33) + 1)))
+    return b
+
+
+def shard_sources(sources, shard_index, num_shards):
+    # Zabbix hosts are spread individually across shards, every other source
+    # is assigned as a whole by its name.
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard index {shard_index} out of range for {num_shards} shards")
+    sharded = []
+    for spec in sources:
+        hostids = spec.get("hostids")
+        if spec["type"] == "zabbix" and not isinstance(hostids, str):
+            mine = [h for h in hostids if jump_hash(h, num_shards) == shard_index]
+            if mine:
+                sharded.append(dict(spec, hostids=mine))
+        elif jump_hash(hostids if spec["type"] == "zabbix" else spec["name"], num_shards) == shard_index:
+            sharded.append(spec)
+    return sharded
+
+
+def merge_results(results):
+    merged = {}
+    for result in results:
+        for name, value in result.items():
+            if isinstance(value, dict) and isinstance(merged.get(name), dict):
+                merged[name] = {**merged[name], **value}
+            elif merged.get(name) is None:
+                merged[name] = value
+    return merged
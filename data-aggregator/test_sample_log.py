@@ -0,0 +1,84 @@
+import os
+
+from sample_log import RECORD, SERIES_FILE, SampleLog
+
+
+class ListSink:
+    def __init__(self):
+        self.samples = []
+
+    def write(self, samples):
+        self.samples.extend(samples)
+
+
+def _log(path, records_per_segment=2, **kwargs):
+    return SampleLog(str(path), segment_bytes=RECORD.size * records_per_segment, **kwargs)
+
+
+def test_rotation_keeps_max_segments_full_segments(tmp_path):
+    log = _log(tmp_path, max_segments=2)
+    for ts in range(9):
+        log.write([("app", "rate", float(ts), ts * 1.0)])
+    log.close()
+    sizes = [os.path.getsize(path) // RECORD.size for path in log.segments()]
+    assert sizes == [2, 2, 1]
+    assert [ts for ts, _, _ in log.iter_records()] == [4.0, 5.0, 6.0, 7.0, 8.0]
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".max")) == [
+        "segment-00000002.max",
+        "segment-00000003.max",
+    ]
+
+
+def test_replay_with_non_monotonic_timestamps(tmp_path):
+    # stale Zabbix items repeat an old lastclock on every poll, so a segment's
+    # last record isn't its newest
+    log = _log(tmp_path, records_per_segment=4)
+    log.write([("app", "rate", 1000.0, 1.0), ("zbx", "cpu", 10.0, 5.0)])
+    log.write([("app", "rate", 1010.0, 2.0), ("zbx", "cpu", 10.0, 5.0)])
+    log.write([("app", "rate", 1020.0, 3.0)])
+    log.close()
+    assert len(log.segments()) == 2
+    sink = ListSink()
+    _log(tmp_path, records_per_segment=4).replay([sink], since=900)
+    assert sink.samples == [("app", "rate", 1000.0, 1.0), ("app", "rate", 1010.0, 2.0), ("app", "rate", 1020.0, 3.0)]
+
+
+def test_old_full_segments_are_skipped(tmp_path):
+    log = _log(tmp_path)
+    for ts in (1.0, 2.0, 100.0, 3.0, 200.0):
+        log.write([("app", "rate", ts, ts)])
+    log.close()
+    # segment 0 holds 1 and 2 only; segment 1 (100, 3) and the open one stay
+    assert len(list(log.scan(since=50))) == 2
+    assert [ts for ts, _, _ in log.iter_records(since=50)] == [100.0, 200.0]
+
+
+def test_reopen_continues_segment_and_tracks_its_newest_timestamp(tmp_path):
+    log = _log(tmp_path)
+    log.write([("app", "rate", 500.0, 1.0)])
+    log.close()
+    log = _log(tmp_path)
+    log.write([("app", "rate", 5.0, 2.0)])
+    log.write([("app", "rate", 6.0, 3.0)])
+    log.close()
+    assert [ts for ts, _, _ in log.iter_records(since=400)] == [500.0]
+
+
+def test_torn_writes_are_dropped_on_reopen(tmp_path):
+    log = _log(tmp_path, records_per_segment=8)
+    log.write([("app", "rate", 1.0, 1.0), ("zbx", "cpu", 2.0, 2.0)])
+    log.close()
+    (segment,) = log.segments()
+    with open(segment, "ab") as f:
+        f.write(RECORD.pack(3.0, 0, 3.0)[:5])
+    with open(os.path.join(tmp_path, SERIES_FILE), "a", encoding="utf-8") as f:
+        f.write("2\tzbx\tme")
+    log = _log(tmp_path, records_per_segment=8)
+    assert log.names == [("app", "rate"), ("zbx", "cpu")]
+    log.write([("zbx", "mem", 4.0, 4.0)])
+    log.close()
+    assert list(log.iter_samples()) == [
+        ("app", "rate", 1.0, 1.0),
+        ("zbx", "cpu", 2.0, 2.0),
+        ("zbx", "mem", 4.0, 4.0),
+    ]
@@ -0,0 +1,132 @@
+from bisect import bisect_right
+
+import numpy as np
+
+AGGREGATES = {
+    "mean": None,
+    "sum": np.add,
+    "min": np.minimum,
+    "max": np.maximum,
+}
+
+
+class Series:
+    # Samples are kept in fixed-size columnar chunks: one timestamp array and
+    # one value array each. Only the last chunk is written to; full chunks are
+    # sealed and never copied again.
+    def __init__(self, chunk_size, ts_dtype, value_dtype):
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self._starts = []
+        self._ts = np.empty(chunk_size, ts_dtype)
+        self._values = np.empty(chunk_size, value_dtype)
+        self._n = 0
+
+    def __len__(self):
+        return len(self.chunks) * self.chunk_size + self._n
+
+    @property
+    def last_ts(self):
+        if self._n:
+            return self._ts[self._n - 1]
+        return self.chunks[-1][0][-1] if self.chunks else None
+
+    def append(self, ts, value):
+        last = self.last_ts
+        if last is not None and ts <= last:
+            return False
+        if not self._n:
+            self._starts.append(ts)
+        self._ts[self._n] = ts
+        self._values[self._n] = value
+        self._n += 1
+        if self._n == self.chunk_size:
+            self.chunks.append((self._ts, self._values))
+            self._ts = np.empty_like(self._ts)
+            self._values = np.empty_like(self._values)
+            self._n = 0
+        return True
+
+    def evict(self, before):
+        drop = 0
+        while drop < len(self.chunks) and self.chunks[drop][0][-1] < before:
+            drop += 1
+        if drop:
+            del self.chunks[:drop]
+            del self._starts[:drop]
+
+    def _segments(self):
+        yield from self.chunks
+        if self._n:
+            yield self._ts[:self._n], self._values[:self._n]
+
+    def range(self, start=None, end=None):
+        first = 0 if start is None else max(bisect_right(self._starts, start) - 1, 0)
+        ts_parts, value_parts = [], []
+        for ts, values in list(self._segments())[first:]:
+            if end is not None and ts[0] > end:
+                break
+            lo = 0 if start is None else np.searchsorted(ts, start, "left")
+            hi = len(ts) if end is None else np.searchsorted(ts, end, "right")
+            if lo < hi:
+                ts_parts.append(ts[lo:hi])
+                value_parts.append(values[lo:hi])
+        if not ts_parts:
+            return np.empty(0, self._ts.dtype), np.empty(0, self._values.dtype)
+        if len(ts_parts) == 1:
+            return ts_parts[0], value_parts[0]
+        return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+    @property
+    def nbytes(self):
+        return (len(self.chunks) + 1) * (self._ts.nbytes + self._values.nbytes)
+
+
+class TimeSeriesStore:
+    # uint32 seconds and float64 values keep a sample at 12 bytes: a week of
+    # 10-second samples is ~0.7 MB per series. float64 holds integer counters
+    # exactly up to 2**53; value_dtype=np.float32 halves the values but
+    # rounds integers above 2**24 (123456789 becomes 123456792).
+    def __init__(self, chunk_size=4096, ts_dtype=np.uint32, value_dtype=np.float64, retention=None):
+        self.chunk_size = chunk_size
+        self.ts_dtype = ts_dtype
+        self.value_dtype = value_dtype
+        self.retention = retention
+        self.series = {}
+
+    def append(self, source, metric, ts, value):
+        series = self.series.get((source, metric))
+        if series is None:
+            series = self.series[(source, metric)] = Series(self.chunk_size, self.ts_dtype, self.value_dtype)
+        n_chunks = len(series.chunks)
+        series.append(ts, value)
+        if self.retention and len(series.chunks) > n_chunks:
+            series.evict(ts - self.retention)
+
+    def write(self, samples):
+        for source, metric, ts, value in samples:
+            self.append(source, metric, ts, value)
+
+    def range(self, source, metric, start=None, end=None):
+        series = self.series.get((source, metric))
+        if series is None:
+            return np.empty(0, self.ts_dtype), np.empty(0, self.value_dtype)
+        return series.range(start, end)
+
+    def downsample(self, source, metric, step, start=None, end=None, how="mean"):
+        if how not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate {how!r}, expected one of {sorted(AGGREGATES)}")
+        ts, values = self.range(source, metric, start, end)
+        if not len(ts):
+            return ts, values.astype(np.float64)
+        buckets = (ts.astype(np.int64) // step) * step
+        bucket_ts, first = np.unique(buckets, return_index=True)
+        values = values.astype(np.float64)
+        if how == "mean":
+            counts = np.diff(np.append(first, len(values)))
+            return bucket_ts, np.add.reduceat(values, first) / counts
+        return bucket_ts, AGGREGATES[how].reduceat(values, first)
+
+    @property
+    def nbytes(self):
+        return sum(series.nbytes for series in self.series.values())
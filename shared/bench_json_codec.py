@@ -0,0 +1,48 @@
+import random
+import timeit
+
+import json_codec
+
+
+def make_item_get_response(n=10000):
+    items = []
+    for i in range(n):
+        items.append(
+            {
+                "itemid": str(30000 + i),
+                "type": "0",
+                "hostid": "10105",
+                "name": f"CPU utilization core {i % 64}",
+                "key_": f"system.cpu.util[{i % 64},user]",
+                "delay": "1m",
+                "history": "90d",
+                "trends": "365d",
+                "status": "0",
+                "value_type": "0",
+                "units": "%",
+                "lastclock": str(1700000000 + i),
+                "lastns": str(random.randint(0, 999999999)),
+                "lastvalue": f"{random.uniform(0, 100):.4f}",
+                "prevvalue": f"{random.uniform(0, 100):.4f}",
+                "state": "0",
+                "error": "",
+                "description": "Utilization of a single CPU core in user mode.",
+            }
+        )
+    return {"jsonrpc": "2.0", "result": items, "id": 2}
+
+
+def main(n=10000, repeat=5):
+    response = make_item_get_response(n)
+    payload = json_codec.CODECS["json"][0](response)
+    print(f"item.get response: {n} items, {len(payload) / 1e6:.1f} MB; default codec: {json_codec.name}")
+    baseline = None
+    for name, (dumps, loads) in json_codec.CODECS.items():
+        parse = min(timeit.repeat(lambda: loads(payload), number=1, repeat=repeat))
+        encode = min(timeit.repeat(lambda: dumps(response), number=1, repeat=repeat))
+        baseline = baseline or parse
+        print(f"{name:>7}: parse {parse * 1000:7.1f} ms ({baseline / parse:4.1f}x)  encode {encode * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
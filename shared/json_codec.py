@@ -0,0 +1,26 @@
+import json
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+CODECS = {"json": (_stdlib_dumps, json.loads)}
+
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    CODECS["ujson"] = (lambda obj: ujson.dumps(obj, ensure_ascii=False).encode(), ujson.loads)
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    CODECS["orjson"] = (orjson.dumps, orjson.loads)
+
+# fastest available backend first
+name = next(n for n in ("orjson", "ujson", "json") if n in CODECS)
+dumps, loads = CODECS[name]
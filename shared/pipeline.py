@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _remaining(deadline):
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+class Stage:
+    # func is called once per input item; returning None drops the item and,
+    # with flatten=True, every element of the returned iterable is passed on
+    # separately.
+    def __init__(self, name, func, workers=1, queue_size=100, flatten=False):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.flatten = flatten
+        self.inbox = queue.Queue(queue_size)
+        self.processed = 0
+        self.errors = 0
+        self._threads = []
+        self._lock = threading.Lock()
+
+
+class Pipeline:
+    # Stages are connected by bounded queues: when a stage falls behind, its
+    # inbox fills up and upstream workers (and finally put()) block instead of
+    # buffering without limit.
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def start(self):
+        for i, stage in enumerate(self.stages):
+            downstream = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(stage, downstream), name=f"{stage.name}-{n}", daemon=True
+                )
+                thread.start()
+                stage._threads.append(thread)
+
+    def put(self, item, timeout=None):
+        self.stages[0].inbox.put(item, timeout=timeout)
+
+    def close(self, timeout=None):
+        # drains every stage in order before stopping the next one; with a
+        # timeout, gives up on a stage that is stuck (its daemon threads are
+        # left behind) and returns False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stage in self.stages:
+            try:
+                for _ in stage._threads:
+                    stage.inbox.put(_DONE, timeout=_remaining(deadline))
+            except queue.Full:
+                log.warning("stage %s did not drain in time", stage.name)
+                return False
+            for thread in stage._threads:
+                thread.join(_remaining(deadline))
+                if thread.is_alive():
+                    log.warning("stage %s did not drain in time", stage.name)
+                    return False
+            stage._threads = []
+        return True
+
+    def stats(self):
+        return {
+            stage.name: {"queued": stage.inbox.qsize(), "processed": stage.processed, "errors": stage.errors}
+            for stage in self.stages
+        }
+
+    def _work(self, stage, downstream):
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                return
+            try:
+                result = stage.func(item)
+                if result is None or downstream is None:
+                    outputs = ()
+                elif stage.flatten:
+                    # a result that isn't iterable counts as a failure of
+                    # this item instead of killing the worker
+                    outputs = list(result)
+                else:
+                    outputs = (result,)
+            except Exception:
+                log.exception("stage %s failed", stage.name)
+                with stage._lock:
+                    stage.errors += 1
+                continue
+            with stage._lock:
+                stage.processed += 1
+            for out in outputs:
+                downstream.inbox.put(out)
@@ -0,0 +1,77 @@
+import asyncio
+
+import aiohttp
+
+import json_codec
+from zabbix_client import _item_params, _result
+from zabbix_item import ZabbixItem
+
+
+class AsyncZabbixClient:
+    def __init__(self, url, user, password, concurrency=20, timeout=30):
+        self.url = url
+        self.user = user
+        self.password = password
+        self.auth = None
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+        self._login_lock = asyncio.Lock()
+
+    async def _post(self, payload):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                timeout=self.timeout, headers={"Content-Type": "application/json-rpc"}
+            )
+        async with self.semaphore:
+            async with self.session.post(self.url, data=json_codec.dumps(payload)) as res:
+                return json_codec.loads(await res.read())
+
+    async def _ensure_auth(self):
+        if self.auth is None:
+            async with self._login_lock:
+                if self.auth is None:
+                    self.auth = await self.login(self.user, self.password)
+        return self.auth
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def login(self, user, password):
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "user.login",
+            "params": {"user": user, "password": password},
+            "id": 1,
+            "auth": None,
+        }
+        res = await self._post(payload)
+        return _result(res)
+
+    async def get_items(self, hostid, output="extend", filter=None, search=None, limit=None, records=False):
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "item.get",
+            "params": _item_params(hostid, output, filter, search, limit),
+            "auth": await self._ensure_auth(),
+            "id": 2,
+        }
+        res = await self._post(payload)
+        items = _result(res)
+        return [ZabbixItem.from_dict(item) for item in items] if records else items
+
+    async def get_items_many(self, hostids, output="extend", filter=None, search=None, limit=None, records=False):
+        hostids = list(hostids)
+        await self._ensure_auth()
+        results = await asyncio.gather(
+            *(self.get_items(hostid, output, filter, search, limit, records) for hostid in hostids)
+        )
+        return dict(zip(hostids, results))
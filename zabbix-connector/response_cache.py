@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+MISS = object()
+
+# Seconds a response stays fresh, per API method. Methods not listed here are
+# never cached, so value-bearing calls always reach the server.
+DEFAULT_TTLS = {
+    "host.get": 300,
+    "hostgroup.get": 3600,
+    "template.get": 3600,
+    "application.get": 3600,
+    "trigger.get": 60,
+}
+
+# item.get is only cached when the requested columns are pure metadata
+ITEM_METADATA_TTL = 300
+ITEM_VALUE_FIELDS = {"lastvalue", "lastclock", "prevvalue", "lastns", "state", "error"}
+
+
+class ResponseCache:
+    def __init__(self, maxsize=1024, ttls=None, item_metadata_ttl=ITEM_METADATA_TTL):
+        self.maxsize = maxsize
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.item_metadata_ttl = item_metadata_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl(self, method, params):
+        if method == "item.get":
+            output = params.get("output", "extend")
+            if isinstance(output, str) or ITEM_VALUE_FIELDS.intersection(output):
+                return self.ttls.get(method, 0)
+            return self.ttls.get(method, self.item_metadata_ttl)
+        return self.ttls.get(method, 0)
+
+    def _key(self, method, params):
+        return method, json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, method, params):
+        if not self.ttl(method, params):
+            return MISS
+        key = self._key(method, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, method, params, value):
+        ttl = self.ttl(method, params)
+        if not ttl:
+            return
+        key = self._key(method, params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, method=None):
+        with self._lock:
+            if method is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == method]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,10 +1,237 @@
+import codecs
+import json
+import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import json_codec
+from response_cache import MISS
+from zabbix_item import ZabbixItem
+
+# (url, user) -> (token, expires_at), shared by every client in the process;
+# the lock also makes concurrent first uses share a single user.login
+_tokens = {}
+_tokens_lock = threading.Lock()
+
+
+class ZabbixAPIError(Exception):
+    def __init__(self, error):
+        self.code = error.get("code")
+        self.data = error.get("data", "")
+        super().__init__(f"{error.get('message', 'Zabbix API error')} {self.data}".strip())
+
+    @property
+    def session_expired(self):
+        data = str(self.data).lower()
+        return "re-login" in data or "session terminated" in data or "not authori" in data
+
+
+def _result(res):
+    if "error" in res:
+        raise ZabbixAPIError(res["error"])
+    return res["result"]
+
+
+def _iter_result(chunks):
+    # Incrementally decodes the "result" array of a JSON-RPC response from an
+    # iterable of byte chunks, yielding one element at a time.
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf = ""
+    while True:
+        start = buf.find('"result"')
+        error = buf.find('"error"')
+        if error != -1 and (start == -1 or error < start):
+            buf += "".join(utf8.decode(chunk) for chunk in chunks) + utf8.decode(b"", final=True)
+            raise ZabbixAPIError(json.loads(buf)["error"])
+        if start != -1:
+            bracket = buf.find("[", start)
+            if bracket != -1:
+                pos = bracket + 1
+                break
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ZabbixAPIError({"message": "Malformed response", "data": buf[:200]})
+        buf += utf8.decode(chunk)
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf):
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                pass
+            else:
+                # a number cut at a chunk edge ("4" of "45", "1" of "1.5")
+                # decodes fine, so scalars must be followed by a delimiter
+                if isinstance(obj, (dict, list, str)) or (end < len(buf) and buf[end] in " \t\r\n,]"):
+                    pos = end
+                    yield obj
+                    continue
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ZabbixAPIError({"message": "Truncated response", "data": buf[pos:pos + 200]})
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+
+
+def _update_key(record):
+    return record["itemid"], int(record["clock"]), int(record["ns"])
+
+
+def _item_params(hostid, output="extend", filter=None, search=None, limit=None):
+    params = {"output": output, "hostids": hostid}
+    if filter:
+        params["filter"] = filter
+    if search:
+        params["search"] = search
+    if limit:
+        params["limit"] = limit
+    return params
 
 
 class ZabbixClient:
-    def __init__(self, url, user, password):
+    def __init__(
+        self,
+        url,
+        user,
+        password,
+        pool_size=10,
+        retries=3,
+        timeout=(3.05, 30),
+        token_file=None,
+        token_ttl=3600,
+        cache=None,
+        update_overlap=60,
+    ):
         self.url = url
-        self.auth = self.login(user, password)
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.token_file = token_file
+        self.token_ttl = token_ttl
+        self.cache = cache
+        self.session = self._make_session(pool_size, retries)
+        self.update_overlap = update_overlap
+        self.watermarks = {}
+        self._seen_updates = {}
+
+    def _make_session(self, pool_size, retries):
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers["Content-Type"] = "application/json-rpc"
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _post(self, payload):
+        res = self.session.post(self.url, data=json_codec.dumps(payload), timeout=self.timeout)
+        return json_codec.loads(res.content)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_token_file(self):
+        try:
+            with open(self.token_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_token_file(self, tokens):
+        tmp = f"{self.token_file}.tmp"
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(tokens, f)
+        os.replace(tmp, self.token_file)
+
+    def _cached_token(self):
+        now = time.time()
+        token, expires = _tokens.get((self.url, self.user), (None, 0))
+        if token and expires > now:
+            return token
+        if self.token_file:
+            entry = self._load_token_file().get(f"{self.user}@{self.url}")
+            if entry and entry["expires"] > now:
+                _tokens[(self.url, self.user)] = (entry["token"], entry["expires"])
+                return entry["token"]
+        return None
+
+    def _store_token(self, token):
+        expires = time.time() + self.token_ttl
+        _tokens[(self.url, self.user)] = (token, expires)
+        if self.token_file:
+            tokens = self._load_token_file()
+            tokens[f"{self.user}@{self.url}"] = {"token": token, "expires": expires}
+            self._save_token_file(tokens)
+
+    def _drop_token(self, token):
+        with _tokens_lock:
+            # another thread may already have replaced the expired token
+            if _tokens.get((self.url, self.user), (None, 0))[0] != token:
+                return
+            _tokens.pop((self.url, self.user), None)
+            if self.token_file:
+                tokens = self._load_token_file()
+                if tokens.pop(f"{self.user}@{self.url}", None) is not None:
+                    self._save_token_file(tokens)
+
+    @property
+    def auth(self):
+        token = self._cached_token()
+        if token is None:
+            with _tokens_lock:
+                token = self._cached_token()
+                if token is None:
+                    token = self.login(self.user, self.password)
+                    self._store_token(token)
+        return token
+
+    def _call(self, method, params, id=2):
+        if self.cache is not None:
+            cached = self.cache.get(method, params)
+            if cached is not MISS:
+                return cached
+        for attempt in range(2):
+            auth = self.auth
+            payload = {
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params,
+                "auth": auth,
+                "id": id,
+            }
+            try:
+                result = _result(self._post(payload))
+            except ZabbixAPIError as e:
+                if attempt or not e.session_expired:
+                    raise
+                self._drop_token(auth)
+                continue
+            if self.cache is not None:
+                self.cache.put(method, params, result)
+            return result
+
+    def call(self, method, params):
+        return self._call(method, params)
 
     def login(self, user, password):
         payload = {
@@ -14,16 +241,132 @@ class ZabbixClient:
             "id": 1,
             "auth": None,
         }
-        res = requests.post(self.url, json=payload).json()
-        return res["result"]
+        res = self._post(payload)
+        return _result(res)
 
-    def get_items(self, hostid):
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "item.get",
-            "params": {"output": "extend", "hostids": hostid},
-            "auth": self.auth,
-            "id": 2,
-        }
-        res = requests.post(self.url, json=payload).json()
-        return res["result"]
+    def get_hosts(self, groupids=None, output=("hostid", "host", "name")):
+        params = {"output": list(output)}
+        if groupids:
+            params["groupids"] = groupids
+        return self._call("host.get", params)
+
+    def get_templates(self, output=("templateid", "host", "name")):
+        return self._call("template.get", {"output": list(output)})
+
+    def get_items(self, hostid, output="extend", filter=None, search=None, limit=None, records=False):
+        items = self._call("item.get", _item_params(hostid, output, filter, search, limit))
+        return [ZabbixItem.from_dict(item) for item in items] if records else items
+
+    def iter_items(
+        self, hostid, output="extend", filter=None, search=None, limit=None, records=False, chunk_size=65536
+    ):
+        params = _item_params(hostid, output, filter, search, limit)
+        for attempt in range(2):
+            auth = self.auth
+            payload = {
+                "jsonrpc": "2.0",
+                "method": "item.get",
+                "params": params,
+                "auth": auth,
+                "id": 2,
+            }
+            res = self.session.post(self.url, data=json_codec.dumps(payload), timeout=self.timeout, stream=True)
+            items = _iter_result(res.iter_content(chunk_size))
+            if records:
+                items = map(ZabbixItem.from_dict, items)
+            try:
+                # errors are reported before the first item, so a session can
+                # still be renewed transparently at this point
+                first = next(items, None)
+            except ZabbixAPIError as e:
+                res.close()
+                if attempt or not e.session_expired:
+                    raise
+                self._drop_token(auth)
+                continue
+            try:
+                if first is not None:
+                    yield first
+                    yield from items
+            finally:
+                res.close()
+            return
+
+    def get_items_many(
+        self, hostids, output="extend", filter=None, search=None, limit=None, records=False, batch_size=200
+    ):
+        hostids = list(hostids)
+        items = {}
+        for start in range(0, len(hostids), batch_size):
+            chunk = hostids[start:start + batch_size]
+            for attempt in range(2):
+                auth = self.auth
+                payload = [
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "item.get",
+                        "params": _item_params(hostid, output, filter, search, limit),
+                        "auth": auth,
+                        "id": i,
+                    }
+                    for i, hostid in enumerate(chunk)
+                ]
+                res = self._post(payload)
+                if isinstance(res, dict):
+                    # the whole batch was rejected, e.g. an invalid JSON-RPC request
+                    raise ZabbixAPIError(res.get("error", {}))
+                expired = any("error" in r and ZabbixAPIError(r["error"]).session_expired for r in res)
+                if attempt or not expired:
+                    break
+                self._drop_token(auth)
+            by_id = {r.get("id"): r for r in res}
+            for i, hostid in enumerate(chunk):
+                if i not in by_id:
+                    raise ZabbixAPIError({"message": "Missing batch response", "data": f"hostid {hostid}"})
+                result = _result(by_id[i])
+                items[hostid] = [ZabbixItem.from_dict(item) for item in result] if records else result
+        return items
+
+    def get_updates(self, hostid, history=0):
+        # Returns (itemid, clock, ns, value) records not returned by an earlier
+        # poll of this host and value type. The first poll seeds the
+        # watermark from item.get lastclock values; afterwards only
+        # history.get deltas are transferred. Each poll re-reads the last
+        # `update_overlap` seconds, since values with an older clock can
+        # still arrive (proxies, the history syncer) and time_from alone
+        # would miss them; records already returned are recognised by
+        # (itemid, clock, ns).
+        key = (hostid, history)
+        since = self.watermarks.get(key)
+        if since is None:
+            items = self.get_items(
+                hostid,
+                output=["itemid", "lastclock", "lastns", "lastvalue"],
+                filter={"value_type": history},
+            )
+            records = [
+                {"itemid": item["itemid"], "clock": item["lastclock"], "ns": item["lastns"], "value": item["lastvalue"]}
+                for item in items
+                if int(item["lastclock"])
+            ]
+            seen = self._seen_updates[key] = set()
+        else:
+            params = {
+                "output": ["itemid", "clock", "ns", "value"],
+                "hostids": hostid,
+                "history": history,
+                "time_from": since - self.update_overlap,
+                "sortfield": "clock",
+                "sortorder": "ASC",
+            }
+            seen = self._seen_updates[key]
+            records = [r for r in self._call("history.get", params, id=3) if _update_key(r) not in seen]
+        if records:
+            seen.update(_update_key(r) for r in records)
+            newest = max(int(r["clock"]) for r in records)
+            since = newest if since is None else max(since, newest)
+            self.watermarks[key] = since
+            cutoff = since - self.update_overlap
+            for old in [k for k in seen if k[1] < cutoff]:
+                seen.discard(old)
+        return records
@@ -0,0 +1,87 @@
+import sys
+
+FLOAT = 0
+UNSIGNED = 3
+
+DELAY_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_delay(delay):
+    # "30s", "5m", "60" -> seconds; flexible/scheduling intervals after ";"
+    # are ignored, user macros and empty delays (trapper items) give None
+    delay = (delay or "").split(";", 1)[0].strip()
+    if not delay or delay.startswith("{"):
+        return None
+    try:
+        if delay[-1] in DELAY_UNITS:
+            return int(delay[:-1]) * DELAY_UNITS[delay[-1]]
+        return int(delay)
+    except ValueError:
+        return None
+
+
+def _parse_value(value, value_type):
+    if value is None or value == "":
+        return None
+    if value_type == FLOAT:
+        return float(value)
+    if value_type == UNSIGNED:
+        return int(value)
+    if value_type is None:
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+class ZabbixItem:
+    __slots__ = ("itemid", "hostid", "key_", "name", "value_type", "units", "delay", "lastclock", "lastvalue")
+
+    def __init__(
+        self, itemid, hostid=0, key_="", name="", value_type=None, units="", delay=None, lastclock=0, lastvalue=None
+    ):
+        self.itemid = itemid
+        self.hostid = hostid
+        self.key_ = key_
+        self.name = name
+        self.value_type = value_type
+        self.units = units
+        self.delay = delay
+        self.lastclock = lastclock
+        self.lastvalue = lastvalue
+
+    @classmethod
+    def from_dict(cls, item):
+        value_type = item.get("value_type")
+        if value_type is not None:
+            value_type = int(value_type)
+        return cls(
+            int(item.get("itemid", 0)),
+            int(item.get("hostid", 0)),
+            # item keys and units repeat across every host, share one copy
+            sys.intern(item.get("key_", "")),
+            item.get("name", ""),
+            value_type,
+            sys.intern(item.get("units", "")),
+            parse_delay(item.get("delay")),
+            int(item.get("lastclock", 0)),
+            _parse_value(item.get("lastvalue"), value_type),
+        )
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, ZabbixItem):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"ZabbixItem(itemid={self.itemid}, key_={self.key_!r}, lastclock={self.lastclock}, lastvalue={self.lastvalue!r})"